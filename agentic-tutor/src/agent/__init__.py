@@ -3,6 +3,13 @@
 This module defines a custom graph.
 """
 
-from .workflow import graph
-
 __all__ = ["graph"]
+
+
+def __getattr__(name):
+    # Imported on first access so importing the package (e.g. for the
+    # runner) doesn't compile the Studio graph
+    if name == "graph":
+        from .workflow import graph
+        return graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
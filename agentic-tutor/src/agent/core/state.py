@@ -1,56 +1,108 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Literal, Optional
-from pydantic import BaseModel, Field
+from dataclasses import dataclass
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
+from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 
-class Configuration(BaseModel):
-    """Configurable parameters for the agent."""
+@dataclass(frozen=True)
+class Configuration:
+    """Configurable parameters for the agent.
     
-    model_name: str = Field(default="gemini-2.5-flash-lite", description="Google Gemini model to use")
-    max_research_retries: int = Field(default=3, description="Maximum retries for research improvement")
-    temperature: float = Field(default=0.1, description="LLM temperature for consistency")
+    Values come in per run through ``config["configurable"]``; ``CONFIG``
+    holds the defaults so nodes never need to build an instance.
+    """
+    
+    model_name: str = "gemini-2.5-flash-lite"  # Google Gemini model for every LLM call
+    max_research_retries: int = 3  # Maximum retries for research improvement
+    max_lesson_regenerations: int = 3  # Maximum "explain differently" requests per topic
+    temperature: float = 0.1  # LLM temperature for consistency
+    prefetch_research: bool = True  # Search every roadmap topic up front rather than one topic at a time
+
+
+CONFIG = Configuration()
+
+
+# Upper bounds for the history lists kept in state (and in every checkpoint)
+MESSAGE_HISTORY_WINDOW = 50
+QA_HISTORY_WINDOW = 200
+
 
+def add_messages_window(
+    left: List[BaseMessage], right: List[BaseMessage]
+) -> List[BaseMessage]:
+    """Merge messages like ``add_messages``, keeping only the most recent window."""
+    return add_messages(left, right)[-MESSAGE_HISTORY_WINDOW:]
 
-class AgentState(BaseModel):
+
+def append_qa_window(
+    left: List[Tuple[str, str, str]], right: List[Tuple[str, str, str]]
+) -> List[Tuple[str, str, str]]:
+    """Append new Q&A entries, keeping only the most recent window."""
+    return (left + right)[-QA_HISTORY_WINDOW:]
+
+
+def merge_research(
+    left: Dict[str, Dict[str, Any]], right: Dict[str, Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Merge research entries by topic; a ``None`` value removes that topic."""
+    merged = {**left, **right}
+    return {topic: results for topic, results in merged.items() if results is not None}
+
+
+class AgentState(TypedDict, total=False):
     """State for the agentic tutor workflow.
     
     This state tracks the entire learning journey from initial topic
     through prerequisites discovery, roadmap creation, and topic-by-topic learning.
+    
+    ``messages`` and ``questions_asked`` use append reducers, so nodes return
+    just the new items for them, and both are capped to a recent window so
+    long sessions don't grow the checkpoint without bound. The topic lists
+    (prerequisites, roadmap, completed topics) are replaced on every write,
+    so starting a new topic on an existing thread doesn't stack it onto the
+    previous topic's lists.
+    ``prefetched_research`` is merged key by key, and entries are dropped
+    again once their topic is completed.
+    Keys are only present once a node has written them, so nodes read optional
+    keys with ``state.get(...)``.
     """
     
     # Core workflow data
-    initial_topic: str = Field(default="", description="The main topic the user wants to learn")
-    prerequisites: List[str] = Field(default_factory=list, description="All discovered prerequisites")
-    known_prerequisites: List[str] = Field(default_factory=list, description="Prerequisites the user already knows")
-    unknown_prerequisites: List[str] = Field(default_factory=list, description="Prerequisites the user doesn't know")
-    learning_roadmap: List[str] = Field(default_factory=list, description="Ordered learning sequence")
-    completed_topics: List[str] = Field(default_factory=list, description="Topics that have been learned")
-    current_topic_index: int = Field(default=0, description="Current position in roadmap")
+    initial_topic: str  # The main topic the user wants to learn
+    prerequisites: List[str]  # All discovered prerequisites
+    known_prerequisites: List[str]  # Prerequisites the user already knows
+    unknown_prerequisites: List[str]  # Prerequisites the user doesn't know
+    learning_roadmap: List[str]  # Ordered learning sequence
+    completed_topics: List[str]  # Topics that have been learned
+    current_topic_index: int  # Current position in roadmap
     
     # Conversation history - using LangGraph's message handling
-    messages: List[BaseMessage] = Field(default_factory=list, description="Conversation history")
+    messages: Annotated[List[BaseMessage], add_messages_window]  # Conversation history (recent window)
     
     # Current learning session data
-    current_topic: str = Field(default="", description="Currently learning topic")
-    current_research: str = Field(default="", description="Research content for current topic")
-    current_lesson: str = Field(default="", description="Generated lesson content")
-    topic_complete: bool = Field(default=False, description="Whether current topic is complete")
+    current_topic: str  # Currently learning topic
+    current_research: bytes  # Research content for current topic, zlib-compressed (see utils.serialization)
+    prefetched_research: Annotated[Dict[str, Dict[str, Any]], merge_research]  # Search results fetched ahead of time, keyed by topic (merged)
+    current_lesson: str  # Generated lesson content
+    topic_complete: bool  # Whether current topic is complete
     
     # Human-in-the-loop interaction
-    awaiting_user_input: bool = Field(default=False, description="Whether system is waiting for user input")
-    user_selection: List[str] = Field(default_factory=list, description="User's prerequisite selections")
+    awaiting_user_input: bool  # Whether system is waiting for user input
+    user_selection: List[str]  # User's prerequisite selections
     
     # Q&A tracking
-    last_qa_question: str = Field(default="", description="Last question asked by user")
-    last_qa_answer: str = Field(default="", description="Last answer provided to user")
-    questions_asked: List[Dict[str, str]] = Field(default_factory=list, description="A list of all questions asked and answers received during the session")
+    last_qa_question: str  # Last question asked by user
+    last_qa_answer: str  # Last answer provided to user
+    questions_asked: Annotated[List[Tuple[str, str, str]], append_qa_window]  # (topic, question, answer) records from the session (recent window)
+    questions_asked_count: int  # Total questions asked in the session (questions_asked is only a recent window)
+    lesson_answers: Dict[str, str]  # Answers given on the current lesson, keyed by normalized question
     
     # Session completion data
-    session_completion_data: Dict[str, Any] = Field(default_factory=dict, description="Complete session summary data")
+    session_completion_data: Dict[str, Any]  # Complete session summary data
     
     # Loop control and error handling
-    research_retry_count: int = Field(default=0, description="Number of research retries for current topic")
-    workflow_stage: Literal["start", "prerequisites", "human_selection", "roadmap", "learning", "session_summary", "complete"] = Field(
-        default="start", description="Current stage of the workflow"
-    ) 
\ No newline at end of file
+    research_retry_count: int  # Number of research retries for current topic
+    regeneration_count: int  # Lesson regenerations requested for current topic
+    workflow_stage: Literal["start", "prerequisites", "human_selection", "roadmap", "learning", "session_summary", "complete"]  # Current stage of the workflow
@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
@@ -6,40 +6,23 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.types import interrupt
 
 from ..core.state import AgentState
-from ..utils.clients import get_llm
+from ..utils.clients import astream_text, get_llm
 
 
-async def session_summary_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Generate a comprehensive learning session summary.
-    
-    This node creates an intelligent summary of the entire learning journey,
-    including insights, connections, and next steps recommendations.
-    """
-    print(f"📊 Session Summary: Generating comprehensive learning summary")
-    
-    llm = get_llm(config)
-    
-    # Gather all session information
-    initial_topic = state.initial_topic
-    prerequisites = state.prerequisites
-    known_prerequisites = state.known_prerequisites
-    unknown_prerequisites = state.unknown_prerequisites
-    learning_roadmap = state.learning_roadmap
-    completed_topics = state.completed_topics
-    
-    # Calculate session statistics
-    total_topics = len(learning_roadmap)
-    total_prerequisites_found = len(prerequisites)
-    topics_learned = len(completed_topics)
-    
-    # Extract questions asked during the session from the state
-    questions_asked_from_state = state.questions_asked
-    questions_count = len(questions_asked_from_state)
-    questions_list_for_prompt = "; ".join([qa['question'] for qa in questions_asked_from_state]) if questions_asked_from_state else "No questions asked"
-    
-    # Create comprehensive summary prompt
-    summary_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert learning advisor creating a comprehensive summary of a student's learning journey.
+# Bounds on the Q&A text sent to the summary prompt, so its input size stays
+# flat however many questions a long session collects
+SUMMARY_MAX_QUESTIONS = 20
+SUMMARY_MAX_QUESTION_CHARS = 200
+
+
+def _join_or_none(topics: List[str]) -> str:
+    """Join topics for the summary prompt, or "None" if there are none."""
+    return ", ".join(topics) or "None"
+
+
+# Prompt for the end-of-session summary
+_SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert learning advisor creating a comprehensive summary of a student's learning journey.
 
 Your task is to create an engaging, insightful summary that:
 1. Celebrates their learning achievement
@@ -49,7 +32,7 @@ Your task is to create an engaging, insightful summary that:
 5. Provides practical applications they can now understand
 
 Be encouraging, specific, and educational. Adapt your language and examples to the subject matter being learned. Use the actual topics and information provided."""),
-        ("human", """Create a comprehensive learning session summary for this student:
+    ("human", """Create a comprehensive learning session summary for this student:
 
 LEARNING GOAL:
 - Original topic requested: {initial_topic}
@@ -75,14 +58,52 @@ Please create a summary with these sections:
 7. **📊 Session Summary** (stats and achievements)
 
 Make it personal, encouraging, and specific to their actual learning path."""),
-    ])
+])
+
+
+async def session_summary_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Generate a comprehensive learning session summary.
     
-    # Generate the summary
-    response = await llm.ainvoke(summary_prompt.format_messages(
+    This node creates an intelligent summary of the entire learning journey,
+    including insights, connections, and next steps recommendations. It does
+    not interrupt itself: a resumed node re-runs from the top, which would
+    regenerate the summary, so the summary is shown by ``session_completion``.
+    """
+    print(f"📊 Session Summary: Generating comprehensive learning summary")
+    
+    llm = get_llm(config)
+    
+    # Gather all session information
+    initial_topic = state["initial_topic"]
+    prerequisites = state["prerequisites"]
+    known_prerequisites = state["known_prerequisites"]
+    unknown_prerequisites = state["unknown_prerequisites"]
+    learning_roadmap = state["learning_roadmap"]
+    completed_topics = state["completed_topics"]
+    
+    # Calculate session statistics
+    total_topics = len(learning_roadmap)
+    total_prerequisites_found = len(prerequisites)
+    topics_learned = len(completed_topics)
+    
+    # Questions are recorded as they are asked, so no message history scan is needed
+    questions_asked_from_state = state.get("questions_asked", [])
+    # questions_asked keeps only a recent window, so the total is counted separately
+    questions_count = state.get("questions_asked_count", len(questions_asked_from_state))
+    # Only the most recent questions, each clipped, go into the prompt
+    recent_questions = questions_asked_from_state[-SUMMARY_MAX_QUESTIONS:]
+    questions_list_for_prompt = "; ".join(
+        f"{question[:SUMMARY_MAX_QUESTION_CHARS]} (on {topic})" for topic, question, _ in recent_questions
+    ) if recent_questions else "No questions asked"
+    if questions_count > len(recent_questions):
+        questions_list_for_prompt += f" (and {questions_count - len(recent_questions)} earlier questions)"
+    
+    # Generate the summary, streamed so the UI can show it as it is written
+    summary_text = await astream_text(llm, _SUMMARY_PROMPT.format_messages(
         initial_topic=initial_topic,
         total_prerequisites=total_prerequisites_found,
-        known_topics=", ".join(known_prerequisites) if known_prerequisites else "None",
-        learned_topics=", ".join(unknown_prerequisites) if unknown_prerequisites else "None", 
+        known_topics=_join_or_none(known_prerequisites),
+        learned_topics=_join_or_none(unknown_prerequisites),
         roadmap=" → ".join(learning_roadmap),
         topics_completed=topics_learned,
         total_topics=total_topics,
@@ -93,7 +114,7 @@ Make it personal, encouraging, and specific to their actual learning path."""),
     # Create the final summary message
     summary_content = f"""# 🎓 Learning Session Complete!
 
-{response.content}
+{summary_text}
 
 ---
 
@@ -101,50 +122,60 @@ Make it personal, encouraging, and specific to their actual learning path."""),
     
     summary_message = AIMessage(content=summary_content)
     
-    # Create session completion data for the UI
+    # Create session completion data for the UI. Only the summary and derived
+    # stats are stored; the topic lists are already top-level state fields
+    # and are added to the display payload by session_completion_node.
     session_completion_data = {
         "session_complete": True,
         "summary_generated": True,
         "initial_topic": initial_topic,
         "total_topics_learned": topics_learned,
         "total_topics_planned": total_topics,
-        "learning_roadmap": learning_roadmap,
-        "completed_topics": completed_topics,
-        "prerequisites_known": known_prerequisites,
-        "prerequisites_learned": unknown_prerequisites,
         "questions_asked_count": questions_count,
-        "session_summary": response.content
+        "session_summary": summary_text
     }
     
-    # Create an interrupt to display the session summary
-    interrupt(
-        {
-            "type": "session_summary_display",
-            "session_completion_data": session_completion_data,
-            "summary_content": summary_content,
-            "summary_message": response.content
-        }
-    )
-    
     return {
         "messages": [summary_message],
         "workflow_stage": "complete",
         "session_completion_data": session_completion_data,
-        "current_lesson": summary_content,  # For display purposes
+        "current_lesson": "",  # Summary is shown from session_completion_data
         "topic_complete": True,
-        "awaiting_user_input": True  # Indicate we're waiting for user to dismiss summary
+        "awaiting_user_input": True  # session_completion waits for the user to dismiss the summary
+    }
+
+
+def _display_completion_data(state: AgentState) -> Dict[str, Any]:
+    """Expand the stored completion data with the topic lists the summary view shows."""
+    return {
+        **state["session_completion_data"],
+        "learning_roadmap": state["learning_roadmap"],
+        "completed_topics": state["completed_topics"],
+        "prerequisites_known": state["known_prerequisites"],
+        "prerequisites_learned": state["unknown_prerequisites"],
     }
 
 
 async def session_completion_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Final session completion node - handles user acknowledgment of summary."""
+    """Final session completion node - shows the summary and handles user acknowledgment.
+    
+    Both interrupts live here rather than in ``session_summary_node``, so
+    resuming them replays this node's cheap body instead of the summary LLM call.
+    """
     print("🎯 Session Completion: Finalizing learning session")
     
+    # Display the session summary. The summary text travels once, inside
+    # session_completion_data, rather than being repeated alongside it.
+    interrupt({
+        "type": "session_summary_display",
+        "session_completion_data": _display_completion_data(state)
+    })
+    
     # Wait for user to acknowledge the session summary
     user_response = interrupt({
         "type": "session_completion_acknowledgment",
         "message": "Thank you for completing your learning journey! Click 'Start New Topic' to begin a new session.",
-        "session_completion_data": state.session_completion_data
+        "session_completion_data": state["session_completion_data"]
     })
     
     # Create final completion message
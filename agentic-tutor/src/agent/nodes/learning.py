@@ -1,136 +1,334 @@
 import asyncio
-from typing import Any, Dict
+from typing import Any, Dict, List, Literal, Optional
 
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
-from langgraph.types import interrupt
+from langgraph.types import Command, interrupt
 
-from ..core.state import AgentState
-from ..utils.clients import get_llm, get_search_client
+from ..core.state import CONFIG, AgentState
+from ..utils.clients import astream_text, cached_search, get_llm
+from ..utils.serialization import compress_text, decompress_text
+from .progress import advance_to_next_topic
 
 
-async def research_agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Research the current topic using web search tools."""
-    current_topic = state.current_topic
-    if not current_topic:
-        return {"current_research": "No topic to research"}
+# Characters of each source's content kept for the lesson prompt
+RESEARCH_CONTENT_CHARS = 300
+
+
+async def _search_topic(topic: str) -> Dict[str, Any]:
+    """Run the research web searches for a topic without blocking the event loop.
+    
+    Several query variants are searched concurrently and their results merged,
+    so the research step costs one round trip rather than one per query. The
+    variants often return the same page, so results are deduplicated by URL.
+    Only the fields the lesson prompt uses are kept, with content already
+    trimmed, since these results are carried in checkpointed state
+    (``prefetched_research``) until their topic is completed.
+    """
+    search_queries = [
+        f"{topic} tutorial explanation",
+        f"{topic} fundamentals guide",
+        f"{topic} examples",
+    ]
+    responses = await asyncio.gather(*(
+        cached_search(query, max_results=2) for query in search_queries
+    ))
+    # Keyed by URL, keeping the first (highest-ranked) copy of each page
+    results_by_url = {}
+    for response in responses:
+        for result in response.get("results", []):
+            results_by_url.setdefault(result.get("url") or id(result), {
+                "title": result.get("title", "No title"),
+                "url": result.get("url", "No URL"),
+                "content": result.get("content", "No content")[:RESEARCH_CONTENT_CHARS],
+            })
+    return {"results": list(results_by_url.values())}
+
+
+def _compile_research(topic: str, search_results: Dict[str, Any]) -> str:
+    """Render search results as the research text given to the lesson prompt."""
+    # One join rather than growing a string per result. Results from
+    # _search_topic are already trimmed; callers may pass raw Tavily results.
+    return f"Research for: {topic}\n\n" + "".join(
+        f"Source {i}: {result.get('title', 'No title')}\n"
+        f"URL: {result.get('url', 'No URL')}\n"
+        f"Content: {result.get('content', 'No content')[:RESEARCH_CONTENT_CHARS]}...\n\n"
+        for i, result in enumerate(search_results.get("results", []), 1)
+    )
+
+
+# Prompt for writing a lesson from research
+_LESSON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert educator with broad knowledge across multiple subjects.
+    Your task is to create clear, engaging educational content from research material.
     
-    print(f"🔬 Research Agent: Researching {current_topic}")
+    Before writing, silently assess the research: keep what is accurate and relevant
+    to the topic, correct or leave out anything doubtful, and fill small gaps from
+    your own knowledge. Do not include this assessment in your answer.
     
-    search_client = get_search_client()
+    Structure your lesson with:
+    1. Brief introduction to the topic
+    2. Key concepts explained simply
+    3. Practical examples where relevant
+    4. Summary of main points
+    5. Connection to next learning steps
     
-    # Perform comprehensive search
-    search_query = f"{current_topic} tutorial explanation fundamentals guide"
-    search_results = await asyncio.to_thread(search_client.search, search_query, max_results=5)
+    Make the content accessible and engaging for students, adapting your teaching style to the subject matter."""),
+    ("human", "Create a comprehensive lesson on: {topic}\n\n"
+             "Based on this research:\n{research}{approach}")
+])
+
+
+# Teaching angles for "explain differently", in rotation. The first lesson
+# uses the prompt's default structured explanation.
+_LESSON_APPROACHES = (
+    "a structured explanation of the key concepts",
+    "a concrete worked example first, building up to the general concepts",
+    "an everyday analogy as the main thread, mapped carefully onto the concepts",
+    "a step-by-step explanation from first principles, defining every term as it appears",
+)
+
+
+def _lesson_approach(regeneration_count: int) -> str:
+    """Instructions for the lesson prompt when the learner asked for a new explanation.
     
-    # Compile research
-    research_content = f"Research for: {current_topic}\n\n"
-    for i, result in enumerate(search_results.get("results", []), 1):
-        research_content += f"Source {i}: {result.get('title', 'No title')}\n"
-        research_content += f"URL: {result.get('url', 'No URL')}\n"
-        research_content += f"Content: {result.get('content', 'No content')[:300]}...\n\n"
+    Each regeneration names the angle the previous lesson took and a
+    different one to take now, so "explain differently" doesn't produce a
+    near copy of the same lesson from the same research.
+    """
+    if not regeneration_count:
+        return ""
     
-    research_message = AIMessage(
-        content=f"🔍 Completed research on {current_topic}. Found {len(search_results.get('results', []))} relevant sources."
+    def angle(count: int) -> str:
+        # The default angle is only used for the first lesson; rewrites cycle through the rest
+        return _LESSON_APPROACHES[1 + (count - 1) % (len(_LESSON_APPROACHES) - 1)] if count else _LESSON_APPROACHES[0]
+    
+    previous, current = angle(regeneration_count - 1), angle(regeneration_count)
+    return (
+        f"\n\nThe student did not follow the previous version of this lesson, which used {previous}. "
+        f"Explain the topic differently this time, using {current}, with new examples and wording."
     )
+
+
+# Prompt for answering a question about the current lesson. The system
+# prompt has no variables and the lesson comes before the question, so
+# successive questions on a topic share a byte-identical prefix that the
+# provider's implicit prompt cache can reuse.
+_QA_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert tutor answering student questions about the lesson they are studying.
     
-    return {
-        "current_research": research_content,
-        "research_retry_count": 0,
-        "messages": [research_message]
-    }
+    Provide clear, helpful answers based on the lesson content. 
+    If the question requires additional examples or clarification, provide them.
+    Keep your answer focused and educational."""),
+    ("human", "Lesson on {topic}:\n{lesson}\n\n"
+             "Student question about {topic}: {question}")
+])
+
+
+# Prompt for answering a free-form follow-up question
+_FOLLOW_UP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert tutor answering student questions.
+    Provide clear, helpful answers based on the topics they've been learning."""),
+    ("human", "{question}")
+])
+
+
+def _normalize_question(question: str) -> str:
+    """Normalize a question so case, spacing and a trailing "?" don't matter."""
+    return " ".join(question.lower().split()).rstrip(" ?")
+
+
+def _prefetch_enabled(config: RunnableConfig) -> bool:
+    """Whether research is searched ahead of the learner (``prefetch_research``)."""
+    return config.get("configurable", {}).get("prefetch_research", CONFIG.prefetch_research)
+
+
+# Upper bound on roadmap topics searched at the same time during prefetch
+PREFETCH_CONCURRENCY = 5
 
 
-async def critique_agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Evaluate the quality and completeness of research."""
-    print(f"🧐 Critique Agent: Reviewing research quality for {state.current_topic}")
+async def prefetch_research_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Search the web for every roadmap topic concurrently.
     
-    llm = get_llm(config)
+    Runs once after the roadmap is created, so later topics' research is
+    already in ``prefetched_research`` when the learner reaches them. Topics
+    whose search fails are left out and searched by the research agent.
+    Setting ``prefetch_research`` to False skips the burst, so only topics the
+    learner actually reaches are searched.
+    """
+    if not _prefetch_enabled(config):
+        print("🔬 Research Prefetch: Disabled, topics will be researched as they come up")
+        return {}
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert content reviewer for educational materials.
-        Your task is to evaluate research content for teaching purposes.
-        
-        Assess if the research content is:
-        1. Accurate and factual
-        2. Comprehensive enough for learning
-        3. Well-structured and clear
-        4. Relevant to the topic
-        
-        Respond with either 'APPROVED' if the content is good enough, or 'NEEDS_IMPROVEMENT' 
-        followed by specific feedback on what needs to be better."""),
-        ("human", "Please review this research content:\n\n{research_content}")
-    ])
+    prefetched = state.get("prefetched_research", {})
+    topics = [topic for topic in dict.fromkeys(state["learning_roadmap"]) if topic not in prefetched]
+    print(f"🔬 Research Prefetch: Searching {len(topics)} roadmap topics")
     
-    response = await llm.ainvoke(prompt.format_messages(research_content=state.current_research))
+    semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
     
-    critique_message = AIMessage(
-        content=f"📋 Research review completed for {state.current_topic}. Quality assessment: {'Approved' if 'APPROVED' in response.content.upper() else 'Needs refinement'}"
-    )
+    async def search(topic: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _search_topic(topic)
+    
+    results = await asyncio.gather(*(search(topic) for topic in topics), return_exceptions=True)
+    
+    fetched = {}
+    for topic, result in zip(topics, results):
+        if isinstance(result, Exception):
+            # Not fatal - the research agent will search for the topic itself
+            print(f"⚠️ Research Prefetch: Search for {topic} failed: {result}")
+            continue
+        fetched[topic] = result
+    
+    return {"prefetched_research": fetched}
+
+
+async def research_agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    """Research the current topic using web search tools.
     
-    # For now, we'll approve after one review to avoid infinite loops
-    approved_research = state.current_research + f"\n\n[REVIEW FEEDBACK: {response.content}]"
+    Uses search results prefetched after roadmap creation (or during the
+    previous lesson's generation) when they are available, and only searches
+    the web otherwise.
+    """
+    current_topic = state["current_topic"]
+    if not current_topic:
+        return {"current_research": compress_text("No topic to research")}
+    
+    search_results = state.get("prefetched_research", {}).get(current_topic)
+    if search_results is not None:
+        print(f"🔬 Research Agent: Using prefetched research for {current_topic}")
+    else:
+        print(f"🔬 Research Agent: Researching {current_topic}")
+        # Perform comprehensive search
+        search_results = await _search_topic(current_topic)
+    
+    research_content = _compile_research(current_topic, search_results)
+    
+    research_message = AIMessage(
+        content=f"🔍 Completed research on {current_topic}. Found {len(search_results.get('results', []))} relevant sources."
+    )
     
     return {
-        "current_research": approved_research,
-        "messages": [critique_message]
+        "current_research": compress_text(research_content),
+        "research_retry_count": 0,
+        "messages": [research_message]
     }
 
 
 async def generation_agent_node_main(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Generate educational content from approved research."""
-    current_topic = state.current_topic
+    """Generate educational content from the topic's research.
+    
+    The model reviews the research for accuracy and relevance as part of the
+    same prompt, so checking the sources costs no separate LLM round trip.
+    If the next roadmap topic has no prefetched research yet, its web search
+    runs concurrently with the lesson so it is ready when the user moves on
+    (unless ``prefetch_research`` is disabled).
+    """
+    current_topic = state["current_topic"]
     print(f"📚 Generation Agent: Creating lesson for {current_topic}")
     
-    llm = get_llm(config)
+    # Prefetch the next topic's search behind this topic's LLM call
+    roadmap = state.get("learning_roadmap", [])
+    next_index = state.get("current_topic_index", 0) + 1
+    next_topic: Optional[str] = roadmap[next_index] if next_index < len(roadmap) else None
+    prefetch = None
+    if next_topic and next_topic not in state.get("prefetched_research", {}) and _prefetch_enabled(config):
+        prefetch = asyncio.create_task(_search_topic(next_topic))
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert educator with broad knowledge across multiple subjects.
-        Your task is to create clear, engaging educational content from research material.
-        
-        Structure your lesson with:
-        1. Brief introduction to the topic
-        2. Key concepts explained simply
-        3. Practical examples where relevant
-        4. Summary of main points
-        5. Connection to next learning steps
-        
-        Make the content accessible and engaging for students, adapting your teaching style to the subject matter."""),
-        ("human", "Create a comprehensive lesson on: {topic}\n\n"
-                 "Based on this research:\n{research}")
-    ])
+    llm = get_llm(config)
     
-    response = await llm.ainvoke(prompt.format_messages(topic=current_topic, research=state.current_research))
+    try:
+        # Streamed so the lesson reaches the UI token by token
+        lesson_text = await astream_text(
+            llm, _LESSON_PROMPT.format_messages(
+                topic=current_topic,
+                research=decompress_text(state["current_research"]),
+                approach=_lesson_approach(state.get("regeneration_count", 0))
+            )
+        )
+    except BaseException:
+        if prefetch is not None:
+            prefetch.cancel()
+        raise
     
     # Create a full lesson message with proper formatting
-    lesson_content = f"# 📖 Lesson: {current_topic}\n\n{response.content}\n\n✅ Topic completed! Ready for your review."
+    lesson_content = f"# 📖 Lesson: {current_topic}\n\n{lesson_text}\n\n✅ Topic completed! Ready for your review."
     
     # Create lesson message for display
     lesson_message = AIMessage(content=lesson_content)
     
-    return {
+    update = {
         "current_lesson": lesson_content,
         "messages": [lesson_message],
         "awaiting_user_input": True,  # Set flag to indicate we're waiting for review
-        "topic_complete": False  # Don't mark as complete until reviewed
+        "topic_complete": False,  # Don't mark as complete until reviewed
+        "lesson_answers": {}  # Earlier answers were written for a different lesson
     }
+    
+    if prefetch is not None:
+        try:
+            update["prefetched_research"] = {next_topic: await prefetch}
+        except Exception as e:
+            # Not fatal - the research agent will search for the topic itself
+            print(f"⚠️ Generation Agent: Prefetch for {next_topic} failed: {e}")
+    
+    return update
 
 
-async def topic_review_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+async def batch_generate_lessons(
+    topics: List[str],
+    search_results: Dict[str, Dict[str, Any]],
+    config: RunnableConfig,
+    max_concurrency: int = 5,
+) -> Dict[str, str]:
+    """Generate lessons for several topics with one batched LLM call.
+    
+    For non-interactive use such as producing a whole roadmap's lessons at
+    once; the graph itself still generates and reviews one topic at a time.
+    Topics missing from ``search_results`` are searched first, concurrently.
+    
+    Args:
+        topics: Topics to write lessons for
+        search_results: Search results per topic, e.g. ``prefetched_research``
+        config: Run configuration passed to ``get_llm``
+        max_concurrency: Maximum number of lesson requests in flight at once
+        
+    Returns:
+        Lesson text keyed by topic
+    """
+    missing = [topic for topic in dict.fromkeys(topics) if topic not in search_results]
+    fetched = await asyncio.gather(*(_search_topic(topic) for topic in missing))
+    results_by_topic = {**search_results, **dict(zip(missing, fetched))}
+    
+    llm = get_llm(config)
+    inputs = [
+        _LESSON_PROMPT.format_messages(topic=topic, research=_compile_research(topic, results_by_topic[topic]), approach="")
+        for topic in topics
+    ]
+    responses = await llm.abatch(inputs, config={"max_concurrency": max_concurrency})
+    return {topic: response.content for topic, response in zip(topics, responses)}
+
+
+async def topic_review_node(
+    state: AgentState, config: RunnableConfig
+) -> Command[Literal["research_agent", "session_summary", "generation_agent_main", "topic_review"]]:
     """Human-in-the-loop topic review after lesson generation.
     
     This node uses interrupt to pause execution and wait for user feedback
-    on the lesson before proceeding to the next topic.
+    on the lesson before proceeding to the next topic. It routes itself with
+    ``Command``: back to review after a question, to generation for a new
+    explanation (reusing the topic's research), or, once the lesson is
+    approved, on to the next topic's research or the session summary.
     """
-    current_topic = state.current_topic
+    current_topic = state["current_topic"]
     print(f"👤 Topic Review: Waiting for user feedback on {current_topic}")
     
     # Use interrupt to pause and wait for user feedback
     user_feedback = interrupt({
         "type": "topic_review",
         "topic": current_topic,
-        "lesson_content": state.current_lesson,
+        "lesson_content": state["current_lesson"],
         "message": f"Please review the lesson on '{current_topic}'. Do you understand the concepts and are ready to continue?",
         "options": [
             {"value": "continue", "label": "✅ I understand, continue to next topic"},
@@ -146,46 +344,66 @@ async def topic_review_node(state: AgentState, config: RunnableConfig) -> Dict[s
         user_question = user_feedback.get("question", "")
         
         if feedback_type == "ask_question" and user_question:
-            # User has a question - answer it and stay in review mode
-            llm = get_llm(config)
-            
-            qa_prompt = ChatPromptTemplate.from_messages([
-                ("system", f"""You are an expert tutor answering student questions about {current_topic}.
-                
-                Provide clear, helpful answers based on the lesson content. 
-                If the question requires additional examples or clarification, provide them.
-                Keep your answer focused and educational."""),
-                ("human", f"Student question about {current_topic}: {user_question}\n\n"
-                         f"Lesson context:\n{state.current_lesson}")
-            ])
-            
-            answer_response = await llm.ainvoke(qa_prompt.format_messages())
+            # User has a question - answer it and stay in review mode. A repeat
+            # of a question already answered on this lesson reuses that answer.
+            lesson_answers = state.get("lesson_answers", {})
+            normalized_question = _normalize_question(user_question)
+            answer = lesson_answers.get(normalized_question)
+            if answer is None:
+                # Cached, so an identical prompt (same lesson and question) in
+                # another session is answered without a model call
+                llm = get_llm(config, cached=True)
+                answer_response = await llm.ainvoke(_QA_PROMPT.format_messages(
+                    topic=current_topic, question=user_question, lesson=state["current_lesson"]
+                ))
+                answer = answer_response.content
             
             qa_message = AIMessage(
-                content=f"📖 **Q&A about {current_topic}:**\n\n**Question:** {user_question}\n\n**Answer:** {answer_response.content}\n\n---\n\n*Please review the lesson and answer above. Choose an option below to continue.*"
+                content=f"📖 **Q&A about {current_topic}:**\n\n**Question:** {user_question}\n\n**Answer:** {answer}\n\n---\n\n*Please review the lesson and answer above. Choose an option below to continue.*"
             )
             
-            return {
+            return Command(goto="topic_review", update={
                 "messages": [qa_message],
                 "awaiting_user_input": True,  # Still waiting for final approval
                 "topic_complete": False,
                 "last_qa_question": user_question,  # Track the question for UI purposes
-                "last_qa_answer": answer_response.content,  # Track the answer for UI purposes
-                "questions_asked": state.questions_asked + [{"question": user_question, "answer": answer_response.content}]
-            }
+                "last_qa_answer": answer,  # Track the answer for UI purposes
+                "questions_asked": [(current_topic, user_question, answer)],
+                "questions_asked_count": state.get("questions_asked_count", 0) + 1,
+                "lesson_answers": {**lesson_answers, normalized_question: answer}
+            })
         
         elif feedback_type == "regenerate":
+            max_regenerations = config.get("configurable", {}).get(
+                "max_lesson_regenerations", CONFIG.max_lesson_regenerations
+            )
+            regeneration_count = state.get("regeneration_count", 0)
+            if regeneration_count >= max_regenerations:
+                # Cap per-topic regenerations; keep the current lesson under review
+                limit_message = AIMessage(
+                    content=f"🔄 This lesson on {current_topic} has already been rewritten {regeneration_count} times. "
+                            "Ask a question about the part that is unclear, or continue when you're ready."
+                )
+                
+                return Command(goto="topic_review", update={
+                    "messages": [limit_message],
+                    "awaiting_user_input": True,
+                    "topic_complete": False
+                })
+            
             # User wants the lesson regenerated - trigger regeneration
             regenerate_message = AIMessage(
                 content=f"🔄 I'll regenerate the lesson on {current_topic} with a different approach."
             )
             
-            return {
+            # current_research is still in state, so skip straight to generation
+            return Command(goto="generation_agent_main", update={
                 "messages": [regenerate_message],
                 "awaiting_user_input": False,
                 "topic_complete": False,
-                "current_lesson": ""  # Clear current lesson to trigger regeneration
-            }
+                "current_lesson": "",  # Clear the old lesson while the new one is generated
+                "regeneration_count": regeneration_count + 1
+            })
         
         else:  # continue or default
             # User is satisfied - mark topic as complete
@@ -193,14 +411,7 @@ async def topic_review_node(state: AgentState, config: RunnableConfig) -> Dict[s
                 content=f"✅ Great! You've completed learning **{current_topic}**. Let's move to the next topic!"
             )
             
-            return {
-                "messages": [approval_message],
-                "awaiting_user_input": False,
-                "topic_complete": True,
-                "last_qa_question": "",  # Clear Q&A state when moving on
-                "last_qa_answer": "",  # Clear Q&A state when moving on
-                "questions_asked": state.questions_asked
-            }
+            return advance_to_next_topic(state, approval_message)
     
     else:
         # Fallback - treat any other response as approval to continue
@@ -208,30 +419,17 @@ async def topic_review_node(state: AgentState, config: RunnableConfig) -> Dict[s
             content=f"✅ Moving on from **{current_topic}** to the next topic!"
         )
         
-        return {
-            "messages": [approval_message],
-            "awaiting_user_input": False,
-            "topic_complete": True,
-            "last_qa_question": "",  # Clear Q&A state when moving on
-            "last_qa_answer": "",  # Clear Q&A state when moving on
-            "questions_asked": state.questions_asked
-        }
+        return advance_to_next_topic(state, approval_message)
 
 
 async def generation_agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Simple generation agent for Q&A sessions."""
     llm = get_llm(config)
     
-    if state.messages:
-        latest_message = state.messages[-1]
+    if state["messages"]:
+        latest_message = state["messages"][-1]
         if hasattr(latest_message, 'content'):
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert tutor answering student questions.
-                Provide clear, helpful answers based on the topics they've been learning."""),
-                ("human", "{question}")
-            ])
-            
-            response = await llm.ainvoke(prompt.format_messages(question=latest_message.content))
+            response = await llm.ainvoke(_FOLLOW_UP_PROMPT.format_messages(question=latest_message.content))
             
             return {
                 "messages": [AIMessage(content=response.content)]
@@ -1,12 +1,58 @@
 import asyncio
-from typing import Any, Dict
+import json
+import sys
+from typing import Annotated, Any, Dict, List
 
+from typing_extensions import TypedDict
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 
 from ..core.state import AgentState
-from ..utils.clients import get_llm, get_search_client
+from ..utils.clients import cached_search, get_llm
+
+
+def _format_search_results(search_results: Dict[str, Any]) -> str:
+    """Render search results as canonical JSON for the prompt.
+    
+    Only the result entries are kept (volatile fields such as ``response_time``
+    are dropped) and keys are sorted, so the same search always produces a
+    byte-identical prompt that provider-side prompt caches can reuse.
+    """
+    results = [
+        {key: result.get(key, "") for key in ("title", "url", "content")}
+        for result in search_results.get("results", [])
+    ]
+    return json.dumps(results, sort_keys=True, ensure_ascii=False)
+
+
+class PrerequisiteList(TypedDict):
+    """Prerequisite topics for learning a topic."""
+    
+    # Annotated descriptions are passed to the model as part of the schema
+    prerequisites: Annotated[List[str], ..., "Prerequisite topic names only, without explanations, in learning order"]
+
+
+# Prompt for analyzing prerequisites
+_PREREQUISITES_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert educator with deep knowledge of learning sequences and dependencies across various subjects.
+    
+    Your task is to identify the ESSENTIAL and SPECIFIC prerequisites for learning the given topic.
+    Focus on:
+    - Direct conceptual dependencies (what must be understood first)
+    - Specific concepts, techniques, or methods that are building blocks
+    - Foundational knowledge that is actually used in the topic
+    - Practical skills needed to implement or understand the topic
+    
+    AVOID overly generic topics unless they are specifically relevant to this subject area.
+    BE SPECIFIC: Break down broad concepts into their essential components.
+    
+    Based on the search results and your expertise, identify 3-6 specific prerequisite topics.
+    
+    List them in the order they should be learned: each topic should come after
+    the topics it depends on, building up in complexity towards the given topic."""),
+    ("human", "Topic to learn: {topic}\n\nSearch results:\n{search_results}")
+])
 
 
 async def prerequisites_agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
@@ -15,42 +61,26 @@ async def prerequisites_agent_node(state: AgentState, config: RunnableConfig) ->
     Uses web search to identify foundational concepts needed before
     learning the target topic.
     """
-    print(f"🔍 Prerequisites Agent: Finding prerequisites for {state.initial_topic}")
-    
-    llm = get_llm(config)
-    search_client = get_search_client()
-    
-    # Search for prerequisites information (async to avoid blocking)
-    search_query = f"prerequisites for learning {state.initial_topic} fundamentals basics"
-    search_results = await asyncio.to_thread(search_client.search, search_query, max_results=3)
-    
-    # Create prompt for analyzing prerequisites
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert educator with deep knowledge of learning sequences and dependencies across various subjects.
-        
-        Your task is to identify the ESSENTIAL and SPECIFIC prerequisites for learning the given topic.
-        Focus on:
-        - Direct conceptual dependencies (what must be understood first)
-        - Specific concepts, techniques, or methods that are building blocks
-        - Foundational knowledge that is actually used in the topic
-        - Practical skills needed to implement or understand the topic
-        
-        AVOID overly generic topics unless they are specifically relevant to this subject area.
-        BE SPECIFIC: Break down broad concepts into their essential components.
-        
-        Based on the search results and your expertise, identify 3-6 specific prerequisite topics.
-        Return ONLY the prerequisite names, one per line, no explanations or bullets."""),
-        ("human", "Topic to learn: {topic}\n\nSearch results:\n{search_results}")
-    ])
-    
-    response = await llm.ainvoke(prompt.format_messages(topic=state.initial_topic, search_results=search_results))
-    
-    # Parse prerequisites from response
-    prerequisites = [line.strip() for line in response.content.split('\n') if line.strip()]
+    initial_topic = state["initial_topic"]
+    print(f"🔍 Prerequisites Agent: Finding prerequisites for {initial_topic}")
+    
+    # Start the (cached) search first so client setup below overlaps with
+    # the Tavily round trip
+    search_query = f"prerequisites for learning {initial_topic} fundamentals basics"
+    search_task = asyncio.create_task(cached_search(search_query, max_results=3))
+    
+    # Structured output returns the list directly, with no text to parse
+    llm = get_llm(config, cached=True).with_structured_output(PrerequisiteList)
+    
+    search_results = await search_task
+    response = await llm.ainvoke(_PREREQUISITES_PROMPT.format_messages(topic=initial_topic, search_results=_format_search_results(search_results)))
+    
+    # Interned so the same topic string is shared across state lists
+    prerequisites = [sys.intern(name.strip()) for name in (response or {}).get("prerequisites", []) if name.strip()]
     
     # Create message for user
     prereq_message = AIMessage(
-        content=f"I found {len(prerequisites)} prerequisites for learning {state.initial_topic}:\n\n" + 
+        content=f"I found {len(prerequisites)} prerequisites for learning {initial_topic}:\n\n" + 
                 "\n".join(f"• {prereq}" for prereq in prerequisites) +
                 "\n\nPlease let me know which of these topics you're already familiar with, and I'll create a personalized learning roadmap for the ones you need to learn."
     )
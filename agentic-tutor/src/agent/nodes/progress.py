@@ -1,51 +1,91 @@
-from typing import Any, Dict
+from typing import Any, Dict, Literal
 
 from langchain_core.messages import AIMessage
-from langchain_core.runnables import RunnableConfig
+from langgraph.types import Command
 
 from ..core.state import AgentState
 
 
-async def progress_tracker_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
-    """Track learning progress and update state.
+def _release_research(topic: str) -> Dict[str, Any]:
+    """State updates that drop a completed topic's research.
     
-    Moves to the next topic in the roadmap or routes to session summary for completion.
+    The research is only needed to (re)generate the topic's lesson, so once
+    the topic is approved it stops being carried in every checkpoint, and
+    the regeneration count starts over for the next topic.
+    """
+    return {
+        "current_research": b"",
+        "regeneration_count": 0,
+        "prefetched_research": {topic: None},  # None removes the entry (see merge_research)
+    }
+
+
+def advance_to_next_topic(
+    state: AgentState, approval_message: AIMessage
+) -> Command[Literal["research_agent", "session_summary"]]:
+    """Track learning progress once the current topic is approved.
+    
+    Marks the current topic completed and moves to the next topic in the
+    roadmap, or routes to the session summary when the roadmap is done. This
+    runs inside ``topic_review``'s approval branch rather than as a graph node
+    of its own: it does no I/O, so a separate step would only add a checkpoint
+    write per topic.
+    
+    Args:
+        state: Current workflow state
+        approval_message: The review's approval message, shown before the progress update
+        
+    Returns:
+        Command routing to the next topic's research or to the session summary
     """
     print(f"📊 Progress Tracker: Updating learning progress")
     
     # Mark current topic as completed
-    completed_topics = state.completed_topics + [state.current_topic]
-    next_index = state.current_topic_index + 1
+    current_topic = state["current_topic"]
+    learning_roadmap = state["learning_roadmap"]
+    completed_topics = state.get("completed_topics", []) + [current_topic]
+    next_index = state["current_topic_index"] + 1
+    
+    # The topic's review is over, whichever way the session goes next
+    review_done = {
+        "awaiting_user_input": False,
+        "last_qa_question": "",  # Clear Q&A state when moving on
+        "last_qa_answer": ""  # Clear Q&A state when moving on
+    }
     
     # Check if we've completed the entire roadmap
-    if next_index >= len(state.learning_roadmap):
+    if next_index >= len(learning_roadmap):
         # Route to session summary instead of ending directly
         completion_message = AIMessage(
             content="🎯 **All topics completed!** Generating your learning session summary..."
         )
         
-        return {
+        return Command(goto="session_summary", update={
             "completed_topics": completed_topics,
             "current_topic_index": next_index,
+            **_release_research(current_topic),
+            **review_done,
             "workflow_stage": "session_summary",  # New stage for summary
-            "messages": [completion_message],
+            "messages": [approval_message, completion_message],
             "topic_complete": False
-        }
+        })
     
     # Move to next topic
-    next_topic = state.learning_roadmap[next_index]
+    next_topic = learning_roadmap[next_index]
     progress_message = AIMessage(
         content=f"🎯 **Progress Update:**\n\n" +
-               f"✅ Completed: {state.current_topic}\n" +
+               f"✅ Completed: {current_topic}\n" +
                f"📍 Next topic: **{next_topic}**\n" +
-               f"📊 Progress: {next_index}/{len(state.learning_roadmap)} topics\n\n" +
+               f"📊 Progress: {next_index}/{len(learning_roadmap)} topics\n\n" +
                f"🚀 Starting research on {next_topic}..."
     )
     
-    return {
+    return Command(goto="research_agent", update={
         "completed_topics": completed_topics,
         "current_topic_index": next_index,
         "current_topic": next_topic,
+        **_release_research(current_topic),
+        **review_done,
         "topic_complete": False,
-        "messages": [progress_message]
-    } 
\ No newline at end of file
+        "messages": [approval_message, progress_message]
+    })
@@ -20,7 +20,7 @@ async def human_selection_node(state: AgentState, config: RunnableConfig) -> Dic
     user_response = interrupt({
         "type": "prerequisite_selection",
         "message": "Please select which of these prerequisites you already know:",
-        "prerequisites": state.prerequisites,
+        "prerequisites": state["prerequisites"],
         "instructions": "Provide a list of prerequisites you're already familiar with"
     })
     
@@ -30,29 +30,31 @@ async def human_selection_node(state: AgentState, config: RunnableConfig) -> Dic
     unknown_prereqs = []
     
     if isinstance(user_response, dict) and "known_prerequisites" in user_response:
-        # User provided their known prerequisites
-        known_prereqs = user_response["known_prerequisites"]
-        # Validate that these are actually from the prerequisite list
-        known_prereqs = [p for p in known_prereqs if p in state.prerequisites]
+        # User provided their known prerequisites; keep only ones that are
+        # actually in the prerequisite list (set membership is O(1))
+        known_set = set(user_response["known_prerequisites"]).intersection(state["prerequisites"])
+        # Both lists follow the prerequisite order, without duplicates
+        ordered_prereqs = list(dict.fromkeys(state["prerequisites"]))
+        known_prereqs = [p for p in ordered_prereqs if p in known_set]
         # Everything else is unknown
-        unknown_prereqs = [p for p in state.prerequisites if p not in known_prereqs]
+        unknown_prereqs = [p for p in ordered_prereqs if p not in known_set]
     else:
         # If user response is not in expected format, assume they don't know any prerequisites
-        unknown_prereqs = state.prerequisites
+        unknown_prereqs = list(dict.fromkeys(state["prerequisites"]))
     
     # If user knows all prerequisites, they still need to learn the main topic
-    if not unknown_prereqs and state.prerequisites:
+    if not unknown_prereqs and state["prerequisites"]:
         # Add a note that user knows all prerequisites
         selection_message = AIMessage(
             content=f"Great! You're already familiar with all the prerequisites:\n" +
                     "\n".join(f"✅ {topic}" for topic in known_prereqs) +
-                    f"\n\nLet's proceed directly to learning **{state.initial_topic}**!"
+                    f"\n\nLet's proceed directly to learning **{state['initial_topic']}**!"
         )
     else:
         selection_message = AIMessage(
             content=f"Based on your selections:\n\n" +
                     f"✅ Known topics ({len(known_prereqs)}):\n" +
-                    "\n".join(f"• {topic}" for topic in known_prereqs) if known_prereqs else "• None" +
+                    ("\n".join(f"• {topic}" for topic in known_prereqs) if known_prereqs else "• None") +
                     f"\n\n📚 Topics to learn ({len(unknown_prereqs)}):\n" +
                     "\n".join(f"• {topic}" for topic in unknown_prereqs) +
                     "\n\nNow I'll create your personalized learning roadmap!"
@@ -1,23 +1,155 @@
 import asyncio
-from typing import Any, Dict
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
-from langchain_core.messages import HumanMessage
-from langgraph.types import Command
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.types import Command, Interrupt
 
-from .workflow import create_graph
+from .core.state import AgentState
+from .nodes.learning import batch_generate_lessons
+from .utils.clients import missing_api_keys
+from .workflow import _default_graph, create_graph
+
+
+# State keys, used to pick user state out of raw checkpoint channels
+_STATE_KEYS = frozenset(AgentState.__annotations__)
+# Channel LangGraph records pending interrupts under, in a checkpoint's writes
+# and in a run's output
+_INTERRUPT_CHANNEL = "__interrupt__"
+# Older LangGraph versions flag interrupts as resumable; newer ones always are
+_INTERRUPT_HAS_RESUMABLE = hasattr(Interrupt, "resumable")
+
+
+@dataclass(frozen=True)
+class InterruptInfo:
+    """A pending human-in-the-loop interrupt, as reported by the runner."""
+    
+    type: str  # Interrupt type set by the node (e.g. "topic_review")
+    data: Any  # Full interrupt payload from the node
+    resumable: bool  # Whether the interrupt can be resumed with Command(resume=...)
+
+
+def _initial_payload(topic: str) -> Dict[str, Any]:
+    """Build the initial graph input for a topic.
+    
+    Built fresh for every session: the ``messages`` reducer assigns an id to
+    the ``HumanMessage`` in place, so a shared message object would carry one
+    session's id into the next. Completed topics and the question count are
+    reset, since a topic started on an existing thread would otherwise
+    inherit the previous topic's progress.
+    """
+    return {
+        "initial_topic": topic,
+        "messages": [HumanMessage(content=f"I want to learn about {topic}")],
+        "completed_topics": [],
+        "questions_asked_count": 0,
+        "workflow_stage": "start"
+    }
 
 
 class TutorWorkflowRunner:
     """Main interface for running the agentic tutor workflow from external applications."""
     
-    def __init__(self, use_checkpointer: bool = True):
+    def __init__(
+        self,
+        use_checkpointer: bool = True,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        durability: Optional[Literal["sync", "async"]] = None,
+    ):
         """Initialize the workflow runner.
         
         Args:
-            use_checkpointer: Whether to use memory checkpointing for interrupt support
+            use_checkpointer: Whether to use memory checkpointing for interrupt support.
+                Runners share the module-level graph (and MemorySaver) for each setting.
+            checkpointer: Optional persistent checkpointer to use instead of MemorySaver
+            durability: LangGraph checkpoint durability for every run
+                (``"sync"`` or ``"async"``); None keeps LangGraph's default.
+                ``"exit"`` is rejected: it drops the resume values of a node
+                that interrupts more than once, and ``session_completion``
+                does, so the session could never finish
+        
+        Raises:
+            ValueError: If ``durability`` is ``"exit"``
         """
-        self.graph = create_graph(with_checkpointer=use_checkpointer)
+        if durability == "exit":
+            raise ValueError(
+                'durability="exit" is not supported: session_completion interrupts twice, '
+                "and exit durability loses the first interrupt's resume value"
+            )
+        
+        if checkpointer is not None:
+            self.graph = create_graph(checkpointer=checkpointer)
+        else:
+            # The module-level graphs (graph / graph_with_memory), shared by all
+            # runners; sessions are isolated by thread_id, so one compiled graph
+            # and MemorySaver serve every runner and graph_with_memory alike
+            self.graph = _default_graph(use_checkpointer)
         self.current_config = None
+        self._run_options: Dict[str, Any] = {"durability": durability} if durability else {}
+    
+    @staticmethod
+    def configure_runtime() -> bool:
+        """Tune the event loops that later ``asyncio.run`` calls create.
+        
+        A session's work is network I/O scheduled by the event loop. Loops
+        run on uvloop when it is installed, since its libuv-based loop
+        dispatches callbacks with less overhead than the default one. On
+        Python 3.12+ they also use the eager task factory, so tasks that
+        finish without suspending (cache hits, checkpoint bookkeeping) run
+        straight away instead of waiting a loop iteration. Call this once at
+        startup, before the first ``asyncio.run``; it only affects loops
+        created afterwards. uvloop is optional and not available on Windows.
+        
+        Returns:
+            True if uvloop was installed as the event loop policy
+        """
+        try:
+            import uvloop
+            base_policy = uvloop.EventLoopPolicy
+        except ImportError:  # uvloop is optional; keep the default loop
+            uvloop = None
+            base_policy = asyncio.DefaultEventLoopPolicy
+        
+        # Python 3.12+; older versions keep the default task factory
+        eager_task_factory = getattr(asyncio, "eager_task_factory", None)
+        
+        class _TutorLoopPolicy(base_policy):
+            def new_event_loop(self) -> asyncio.AbstractEventLoop:
+                loop = super().new_event_loop()
+                if eager_task_factory is not None:
+                    loop.set_task_factory(eager_task_factory)
+                return loop
+        
+        asyncio.set_event_loop_policy(_TutorLoopPolicy())
+        return uvloop is not None
+    
+    @classmethod
+    @asynccontextmanager
+    async def with_sqlite_checkpointer(
+        cls, db_path: str = "agent_state.db", durability: Optional[Literal["sync", "async"]] = None
+    ) -> AsyncIterator["TutorWorkflowRunner"]:
+        """Create a runner that persists sessions to SQLite over one shared connection.
+        
+        Uses ``AsyncSqliteSaver`` so checkpoint writes don't block the event loop
+        while LLM and search calls are in flight. Requires the optional
+        ``langgraph-checkpoint-sqlite`` package.
+        
+        Args:
+            db_path: Path of the SQLite database file
+            durability: Checkpoint durability, as for ``__init__``
+            
+        Yields:
+            A TutorWorkflowRunner whose sessions all share the connection
+        """
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        
+        async with AsyncSqliteSaver.from_conn_string(db_path) as saver:
+            await saver.conn.execute("PRAGMA journal_mode=WAL")
+            await saver.conn.execute("PRAGMA synchronous=NORMAL")
+            yield cls(checkpointer=saver, durability=durability)
     
     def create_session(self, session_id: str = None) -> Dict[str, Any]:
         """Create a new tutoring session.
@@ -29,8 +161,8 @@ class TutorWorkflowRunner:
             Configuration dictionary for the session
         """
         if session_id is None:
-            import uuid
-            session_id = str(uuid.uuid4())
+            # Hex form: same entropy, shorter thread_id in every checkpoint key
+            session_id = uuid.uuid4().hex
         
         self.current_config = {"configurable": {"thread_id": session_id}}
         return self.current_config
@@ -50,23 +182,24 @@ class TutorWorkflowRunner:
         if config is None:
             config = self.create_session()
         
-        initial_state = {
-            "initial_topic": topic,
-            "messages": [HumanMessage(content=f"I want to learn about {topic}")],
-            "workflow_stage": "start"
-        }
+        # Fail fast before any node runs if credentials are not configured
+        missing = missing_api_keys()
+        if missing:
+            return {
+                "success": False,
+                "error": f"Missing API keys: {', '.join(missing)}",
+                "config": config
+            }
+        
+        initial_state = _initial_payload(topic)
         
         try:
             # Run until interrupt or completion
-            result = await self.graph.ainvoke(initial_state, config)
-            
-            # Check for interrupts
-            current_state = self.graph.get_state(config)
-            interrupt_info = self._extract_interrupt_info(current_state)
+            values, interrupt_info = await self._run_until_pause(initial_state, config)
             
             return {
                 "success": True,
-                "state": current_state.values if current_state else {},
+                "state": values,
                 "interrupt": interrupt_info,
                 "config": config
             }
@@ -78,6 +211,24 @@ class TutorWorkflowRunner:
                 "config": config
             }
     
+    async def start_learning_sessions(self, topics: List[str]) -> List[Dict[str, Any]]:
+        """Start several independent learning sessions concurrently.
+        
+        Each topic gets its own thread_id, so the sessions share no state and
+        their LLM and search calls can overlap on a single event loop.
+        
+        Args:
+            topics: The topics to start sessions for
+            
+        Returns:
+            One session result dictionary per topic, in the order given
+        """
+        configs = [self.create_session() for _ in topics]
+        return await asyncio.gather(*(
+            self.start_learning_session(topic, config)
+            for topic, config in zip(topics, configs)
+        ))
+    
     async def resume_with_response(self, user_response: Any, config: Dict[str, Any]) -> Dict[str, Any]:
         """Resume workflow execution with user response.
         
@@ -90,33 +241,53 @@ class TutorWorkflowRunner:
         """
         try:
             # Resume with user response
-            result = await self.graph.ainvoke(Command(resume=user_response), config)
+            values, interrupt_info = await self._run_until_pause(Command(resume=user_response), config)
             
-            # Check if workflow completed - if so, use the result directly
-            current_state = self.graph.get_state(config)
+            # A run that stops without a pending interrupt has reached the end
+            return {
+                "success": True,
+                "state": values,
+                "interrupt": interrupt_info,
+                "config": config,
+                "workflow_completed": interrupt_info is None
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "config": config
+            }
+    
+    async def generate_all_lessons(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate lessons for every topic of a session's roadmap in one batch.
+        
+        Skips the per-topic review loop, for callers that want the whole
+        roadmap's lessons at once. Uses the session's prefetched research
+        where available. The session state itself is not modified.
+        
+        Args:
+            config: Session configuration (the roadmap must already exist)
             
-            # If state is not available (workflow ended), use the result
-            if not current_state or not current_state.values:
-                # Workflow has completed - use the final result
+        Returns:
+            Dictionary with the lessons keyed by topic, or an error
+        """
+        try:
+            values, _, _ = await self._aread_session(config)
+            roadmap = values.get("learning_roadmap", [])
+            if not roadmap:
                 return {
-                    "success": True,
-                    "state": result if result else {},
-                    "interrupt": None,  # No interrupts when workflow ends
-                    "config": config,
-                    "workflow_completed": True
+                    "success": False,
+                    "error": "Session has no learning roadmap yet",
+                    "config": config
                 }
             
-            # Workflow is still active - check for interrupts
-            interrupt_info = self._extract_interrupt_info(current_state)
-            
+            lessons = await batch_generate_lessons(roadmap, values.get("prefetched_research", {}), config)
             return {
                 "success": True,
-                "state": current_state.values,
-                "interrupt": interrupt_info,
-                "config": config,
-                "workflow_completed": False
+                "lessons": lessons,
+                "config": config
             }
-            
         except Exception as e:
             return {
                 "success": False,
@@ -132,20 +303,71 @@ class TutorWorkflowRunner:
             config: Session configuration
             
         Yields:
-            Dictionaries with node updates and workflow information
+            Dictionaries with node updates, a running ``step`` count and
+            workflow information. While a node is generating text (lessons,
+            summaries), items with a ``token`` key carry each text delta and the
+            ``node_name`` producing it, so the UI can render output as it is
+            written. Only model deltas are sent as tokens; complete messages a
+            node returns arrive in its ``node_output`` instead. Tokens carry
+            the ``step`` their node's update will have. When the run stops at
+            an interrupt, an item with an ``interrupt`` key (an ``InterruptInfo``)
+            is yielded; it is not counted as a step. The last
+            item carries the full ``final_state`` taken from the stream itself,
+            so callers don't need to re-read the checkpoint after each step.
         """
+        # Bound once; get_running_loop() is cheaper than get_event_loop()
+        # and is the supported call inside a coroutine
+        loop_time = asyncio.get_running_loop().time
         try:
-            async for chunk in self.graph.astream(initial_state_or_command, config, stream_mode="updates"):
+            final_state = {}
+            # Count steps by hand; wrapping the async stream in enumerate()
+            # would not work and buffering it would defeat streaming
+            step = 0
+            async for mode, chunk in self.graph.astream(
+                initial_state_or_command, config, stream_mode=["updates", "values", "messages"], **self._run_options
+            ):
+                if mode == "values":
+                    final_state = chunk
+                    continue
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    # The messages mode also emits the whole messages nodes
+                    # return in their updates; only forward model deltas, and
+                    # skip empty ones (e.g. structured-output tool calls)
+                    if isinstance(message_chunk, AIMessageChunk) and message_chunk.content:
+                        yield {
+                            "step": step + 1,  # The node's update, once it finishes, is the next step
+                            "node_name": metadata.get("langgraph_node"),
+                            "token": message_chunk.content,
+                            "timestamp": loop_time()
+                        }
+                    continue
                 for node_name, node_output in chunk.items():
+                    if node_name == _INTERRUPT_CHANNEL:
+                        # Pending interrupts, not a node update
+                        if node_output:
+                            yield {
+                                "step": step,
+                                "interrupt": self._interrupt_info(node_output[0]),
+                                "timestamp": loop_time()
+                            }
+                        continue
+                    step += 1
                     yield {
+                        "step": step,
                         "node_name": node_name,
                         "node_output": node_output,
-                        "timestamp": asyncio.get_event_loop().time()
+                        "timestamp": loop_time()
                     }
+            yield {
+                "step": step,
+                "final_state": final_state,
+                "timestamp": loop_time()
+            }
         except Exception as e:
             yield {
                 "error": str(e),
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": loop_time()
             }
     
     def get_session_state(self, config: Dict[str, Any]) -> Dict[str, Any]:
@@ -158,40 +380,139 @@ class TutorWorkflowRunner:
             Current state values and metadata
         """
         try:
-            current_state = self.graph.get_state(config)
-            interrupt_info = self._extract_interrupt_info(current_state)
-            
+            return self._session_result(*self._read_session(config))
+        except Exception as e:
             return {
-                "success": True,
-                "state": current_state.values if current_state else {},
-                "interrupt": interrupt_info,
-                "metadata": current_state.metadata if current_state else {}
+                "success": False,
+                "error": str(e)
             }
+    
+    async def aget_session_state(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Get current session state without blocking the event loop.
+        
+        Use this from async code. It reads the checkpoint through the
+        checkpointer's async API, so a disk- or network-backed checkpointer
+        doesn't stall other sessions. ``AsyncSqliteSaver`` also rejects
+        synchronous reads made from the event loop's thread.
+        
+        Args:
+            config: Session configuration
+            
+        Returns:
+            Current state values and metadata, as for ``get_session_state``
+        """
+        try:
+            return self._session_result(*await self._aread_session(config))
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def _extract_interrupt_info(self, state) -> Dict[str, Any] or None:
+    @staticmethod
+    def _session_result(
+        values: Dict[str, Any], interrupt_info: Optional[InterruptInfo], metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the ``get_session_state`` result for a session read."""
+        return {
+            "success": True,
+            "state": values,
+            "interrupt": interrupt_info,
+            "metadata": metadata
+        }
+    
+    async def _run_until_pause(
+        self, graph_input: Any, config: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Optional[InterruptInfo]]:
+        """Run the graph until it interrupts or ends.
+        
+        The run's output already holds the final state values and, when the
+        run stopped at an interrupt, the pending interrupts under
+        ``"__interrupt__"``, so the checkpoint just written is not read back.
+        
+        Args:
+            graph_input: Initial state, or a ``Command`` resuming an interrupt
+            config: Session configuration
+            
+        Returns:
+            ``(values, interrupt_info)`` for the session after the run
+        """
+        result = await self.graph.ainvoke(graph_input, config, **self._run_options) or {}
+        values = {key: value for key, value in result.items() if key in _STATE_KEYS}
+        interrupts = result.get(_INTERRUPT_CHANNEL)
+        return values, self._interrupt_info(interrupts[0]) if interrupts else None
+    
+    def _read_session(self, config: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[InterruptInfo], Dict[str, Any]]:
+        """Read a session's state values, pending interrupt and metadata.
+        
+        Reads the latest checkpoint tuple straight from the checkpointer rather
+        than through ``graph.get_state``, which rebuilds a full ``StateSnapshot``
+        (channel replay and task inference) that is not needed here. Pending
+        interrupts are taken from the checkpoint's pending writes.
+        
+        Args:
+            config: Session configuration
+            
+        Returns:
+            ``(values, interrupt_info, metadata)`` for the session
+        """
+        checkpointer = self.graph.checkpointer
+        if not isinstance(checkpointer, BaseCheckpointSaver):
+            # No checkpointer of our own (e.g. platform-managed persistence)
+            return self._session_from_snapshot(self.graph.get_state(config))
+        return self._session_from_tuple(checkpointer.get_tuple(config))
+    
+    async def _aread_session(self, config: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[InterruptInfo], Dict[str, Any]]:
+        """Async counterpart of ``_read_session``, using the checkpointer's async API."""
+        checkpointer = self.graph.checkpointer
+        if not isinstance(checkpointer, BaseCheckpointSaver):
+            return self._session_from_snapshot(await self.graph.aget_state(config))
+        return self._session_from_tuple(await checkpointer.aget_tuple(config))
+    
+    def _session_from_snapshot(self, current_state) -> Tuple[Dict[str, Any], Optional[InterruptInfo], Dict[str, Any]]:
+        """Split a ``StateSnapshot`` into ``(values, interrupt_info, metadata)``."""
+        values = current_state.values if current_state else {}
+        metadata = current_state.metadata if current_state else {}
+        return values, self._extract_interrupt_info(current_state), metadata
+    
+    def _session_from_tuple(self, checkpoint_tuple) -> Tuple[Dict[str, Any], Optional[InterruptInfo], Dict[str, Any]]:
+        """Split a ``CheckpointTuple`` into ``(values, interrupt_info, metadata)``."""
+        if checkpoint_tuple is None:
+            return {}, None, {}
+        
+        channel_values = checkpoint_tuple.checkpoint["channel_values"]
+        values = {key: value for key, value in channel_values.items() if key in _STATE_KEYS}
+        interrupts = [
+            interrupt
+            for _, channel, value in checkpoint_tuple.pending_writes or []
+            if channel == _INTERRUPT_CHANNEL
+            for interrupt in value
+        ]
+        interrupt_info = self._interrupt_info(interrupts[0]) if interrupts else None
+        return values, interrupt_info, checkpoint_tuple.metadata or {}
+    
+    @staticmethod
+    def _interrupt_info(interrupt: Interrupt) -> InterruptInfo:
+        """Describe a LangGraph ``Interrupt`` for callers of the runner."""
+        value = interrupt.value
+        return InterruptInfo(
+            type=value.get("type") if value else "unknown",
+            data=value,
+            resumable=interrupt.resumable if _INTERRUPT_HAS_RESUMABLE else True
+        )
+    
+    def _extract_interrupt_info(self, state) -> Optional[InterruptInfo]:
         """Extract interrupt information from the graph state.
         
         Args:
             state: LangGraph state object
             
         Returns:
-            Interrupt information dictionary or None
+            InterruptInfo for the pending interrupt, or None
         """
-        if not state or not state.tasks:
+        tasks = state.tasks if state else None
+        if not tasks:
             return None
         
-        for task in state.tasks:
-            if task.interrupts:
-                interrupt = task.interrupts[0]
-                return {
-                    "type": interrupt.value.get("type") if interrupt.value else "unknown",
-                    "data": interrupt.value,
-                    "resumable": getattr(interrupt, 'resumable', True)
-                }
-        
-        return None 
\ No newline at end of file
+        interrupt = next((task.interrupts[0] for task in tasks if task.interrupts), None)
+        return self._interrupt_info(interrupt) if interrupt is not None else None 
\ No newline at end of file
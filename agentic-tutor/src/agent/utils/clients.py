@@ -1,22 +1,229 @@
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache, partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
 from tavily import TavilyClient
 
-# Initialize the LLM
-def get_llm(config: RunnableConfig) -> ChatGoogleGenerativeAI:
-    """Get configured Google Gemini model."""
-    configuration = config.get("configurable", {})
-    model_name = configuration.get("model_name", "gemini-2.5-flash-lite")
-    temperature = configuration.get("temperature", 0.1)
+from ..core.state import CONFIG
+
+REQUIRED_API_KEYS = ("GOOGLE_API_KEY", "TAVILY_API_KEY")
+
+
+def missing_api_keys() -> List[str]:
+    """Return the required API keys that are not configured.
     
+    A local ``.env`` file is only read when a key is missing from the
+    environment, so the usual path does no file I/O.
+    """
+    missing = [name for name in REQUIRED_API_KEYS if not os.getenv(name)]
+    if missing:
+        load_dotenv(override=False)
+        missing = [name for name in missing if not os.getenv(name)]
+    return missing
+
+# Response cache for idempotent prompts: prerequisite discovery and Q&A
+# answers (whose key includes the lesson, so a regenerated lesson gets fresh
+# answers). Lesson and summary calls never use it, so "regenerate" still
+# produces a fresh lesson. Bounded, since Q&A keys carry the full lesson text.
+LLM_CACHE_MAX_ENTRIES = 256
+LLM_CACHE = InMemoryCache(maxsize=LLM_CACHE_MAX_ENTRIES)
+
+
+@lru_cache(maxsize=8)
+def _make_llm(model_name: str, temperature: float, api_key: Optional[str], cached: bool) -> ChatGoogleGenerativeAI:
+    """Build a Gemini chat model (memoized, so its HTTP client is reused)."""
     return ChatGoogleGenerativeAI(
         model=model_name,
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=temperature
+        google_api_key=api_key,
+        temperature=temperature,
+        cache=LLM_CACHE if cached else None
     )
 
+
+# Initialize the LLM
+def get_llm(config: RunnableConfig, cached: bool = False) -> ChatGoogleGenerativeAI:
+    """Get configured Google Gemini model.
+    
+    Models are shared per (model, temperature, API key, cached), so repeated
+    node calls reuse one client and its connection pool.
+    
+    Args:
+        config: Run configuration with optional ``model_name`` and ``temperature``
+        cached: If True, identical prompts are answered from ``LLM_CACHE``
+    """
+    configuration = config.get("configurable", {})
+    model_name = configuration.get("model_name", CONFIG.model_name)
+    temperature = configuration.get("temperature", CONFIG.temperature)
+    
+    return _make_llm(model_name, temperature, os.getenv("GOOGLE_API_KEY"), cached)
+
+
+@lru_cache(maxsize=4)
+def _make_search_client(api_key: Optional[str]) -> TavilyClient:
+    """Build a Tavily client for an API key (memoized)."""
+    return TavilyClient(api_key=api_key)
+
+
 # Initialize Tavily search client
 def get_search_client() -> TavilyClient:
-    """Get configured Tavily search client."""
-    return TavilyClient(api_key=os.getenv("TAVILY_API_KEY")) 
\ No newline at end of file
+    """Get configured Tavily search client.
+    
+    The client is reused for as long as the configured API key is unchanged.
+    """
+    return _make_search_client(os.getenv("TAVILY_API_KEY"))
+
+
+# Search results cache: (normalized query, max_results) -> (fetched_at, results)
+SEARCH_CACHE_TTL_SECONDS = 3600
+SEARCH_CACHE_MAX_ENTRIES = 256
+# Optional on-disk cache shared across sessions and restarts, enabled by
+# pointing SEARCH_CACHE_DB at a SQLite file; tutorial content changes slowly
+SEARCH_CACHE_DB_ENV = "SEARCH_CACHE_DB"
+PERSISTENT_SEARCH_TTL_SECONDS = 7 * 24 * 3600
+_search_cache: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# The cache is shared by every session's thread and loop (Streamlit runs each
+# browser session on its own thread), so reads and updates hold this lock
+_search_cache_lock = threading.Lock()
+# In-flight searches per event loop, so concurrent identical searches on one
+# loop share a Task; a Task from another loop (another Streamlit session or
+# asyncio.run call) could not be awaited
+_inflight_searches: Dict[asyncio.AbstractEventLoop, Dict[Tuple[str, int], "asyncio.Task[Dict[str, Any]]"]] = {}
+
+# Dedicated pool for the blocking Tavily calls. It bounds concurrent requests
+# to the API during prefetch bursts and, unlike the per-loop default executor
+# used by asyncio.to_thread, keeps its threads across asyncio.run calls.
+SEARCH_MAX_WORKERS = 8
+SEARCH_POOL = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="tavily")
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize a search query so case and spacing variants share a cache entry.
+    
+    Punctuation is kept, since it can be meaningful in topics ("C" vs "C++").
+    """
+    return " ".join(query.lower().split())
+
+
+def _search_with_store(
+    search_client: TavilyClient, query: str, max_results: int, key: Tuple[str, int]
+) -> Dict[str, Any]:
+    """Search via the on-disk cache when one is configured (blocking; run in a thread)."""
+    db_path = os.getenv(SEARCH_CACHE_DB_ENV)
+    if not db_path:
+        return search_client.search(query, max_results=max_results)
+    
+    digest = hashlib.sha256(f"{key[1]}:{key[0]}".encode("utf-8")).hexdigest()
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache "
+            "(key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, results TEXT NOT NULL)"
+        )
+        row = conn.execute(
+            "SELECT results FROM search_cache WHERE key = ? AND fetched_at > ?",
+            (digest, time.time() - PERSISTENT_SEARCH_TTL_SECONDS)
+        ).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        
+        results = search_client.search(query, max_results=max_results)
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, fetched_at, results) VALUES (?, ?, ?)",
+            (digest, time.time(), json.dumps(results))
+        )
+    return results
+
+
+async def _run_search(query: str, max_results: int, key: Tuple[str, int]) -> Dict[str, Any]:
+    """Run one search on ``SEARCH_POOL``.
+    
+    Wrapped in a coroutine so the search runs as a Task: ``asyncio.run``
+    cancels pending Tasks when it shuts its loop down, which releases the
+    in-flight slot, whereas a bare executor future would be left unresolved.
+    """
+    search_client = get_search_client()
+    return await asyncio.get_running_loop().run_in_executor(
+        SEARCH_POOL, partial(_search_with_store, search_client, query, max_results, key)
+    )
+
+
+def _finish_search(
+    loop: asyncio.AbstractEventLoop, key: Tuple[str, int], task: "asyncio.Task[Dict[str, Any]]"
+) -> None:
+    """Record a completed search in the cache and release its in-flight slot."""
+    with _search_cache_lock:
+        inflight = _inflight_searches.get(loop)
+        if inflight is not None:
+            inflight.pop(key, None)
+            if not inflight:
+                # Drop the loop's entry so a finished loop isn't kept alive
+                del _inflight_searches[loop]
+    if task.cancelled() or task.exception() is not None:
+        return
+    with _search_cache_lock:
+        _search_cache[key] = (time.monotonic(), task.result())
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+            _search_cache.popitem(last=False)
+
+
+async def cached_search(query: str, max_results: int) -> Dict[str, Any]:
+    """Run a Tavily search, reusing recent results for the same query.
+    
+    Queries are matched ignoring case and spacing differences.
+    Results are kept in an LRU cache for ``SEARCH_CACHE_TTL_SECONDS``, and
+    concurrent identical searches on the same event loop share one request
+    instead of each hitting the API. If ``SEARCH_CACHE_DB`` names a SQLite file, results are also
+    kept there for ``PERSISTENT_SEARCH_TTL_SECONDS`` so they outlive the
+    process. The blocking client and database calls run on ``SEARCH_POOL``.
+    
+    Args:
+        query: Search query
+        max_results: Maximum number of results to return
+        
+    Returns:
+        The Tavily response dictionary (shared; treat it as read-only)
+    """
+    key = (_normalize_query(query), max_results)
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < SEARCH_CACHE_TTL_SECONDS:
+            _search_cache.move_to_end(key)
+            return entry[1]
+    
+    loop = asyncio.get_running_loop()
+    with _search_cache_lock:
+        inflight = _inflight_searches.setdefault(loop, {})
+        task = inflight.get(key)
+        if task is None:
+            task = loop.create_task(_run_search(query, max_results, key))
+            inflight[key] = task
+            task.add_done_callback(lambda done: _finish_search(loop, key, done))
+    # Shield so one cancelled caller doesn't cancel the search for the others
+    return await asyncio.shield(task)
+
+
+async def astream_text(llm: BaseChatModel, messages: Sequence[BaseMessage]) -> str:
+    """Stream a chat model response and return its full text.
+    
+    Streaming lets LangGraph's ``messages`` stream mode forward tokens to the
+    UI while they are generated; the caller still gets the complete text.
+    """
+    parts = []
+    async for chunk in llm.astream(messages):
+        parts.append(chunk.content)
+    return "".join(parts)
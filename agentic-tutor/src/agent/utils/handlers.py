@@ -14,10 +14,11 @@ class InterruptHandler:
         Returns:
             Command data for resuming the workflow
         """
-        prerequisites = interrupt_data.get("prerequisites", [])
+        # Set membership keeps validation linear in the number of selections
+        prerequisites = set(interrupt_data.get("prerequisites", ()))
         
-        # Validate selections
-        known_prereqs = [p for p in user_selections if p in prerequisites]
+        # Validate selections, keeping their order but dropping repeats
+        known_prereqs = [p for p in dict.fromkeys(user_selections) if p in prerequisites]
         
         return {"known_prerequisites": known_prereqs}
     
@@ -0,0 +1,51 @@
+import zlib
+from typing import Any, Mapping
+
+from langchain_core.messages import BaseMessage
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+    import json
+
+
+def compress_text(text: str) -> bytes:
+    """Compress a large text blob for storage in workflow state."""
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(data: bytes) -> str:
+    """Restore text stored with ``compress_text``."""
+    return zlib.decompress(data).decode("utf-8") if data else ""
+
+
+def _default(value: Any) -> Any:
+    """Encode values the JSON encoders don't handle natively."""
+    if isinstance(value, BaseMessage):
+        return {"type": value.type, "content": value.content}
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return f"<{len(value)} compressed bytes>"
+    return str(value)
+
+
+def dumps_state(state: Mapping[str, Any]) -> str:
+    """Serialize workflow state to a JSON string for debugging and export.
+    
+    Uses orjson when it is installed, which is several times faster than the
+    stdlib on large message-heavy states. Keys are sorted in both cases so
+    dumps of the same state are identical.
+    
+    Args:
+        state: Workflow state values (e.g. ``StateSnapshot.values``)
+        
+    Returns:
+        Indented JSON string
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            dict(state), default=_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2
+        ).decode()
+    return json.dumps(dict(state), default=_default, sort_keys=True, indent=2, ensure_ascii=False)
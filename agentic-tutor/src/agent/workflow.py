@@ -1,37 +1,40 @@
+from functools import lru_cache
+from typing import Any, Optional, get_type_hints
+
 from langgraph.graph import StateGraph, END, START
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 
-from .core.state import AgentState, Configuration
+from .core.state import AgentState, Configuration, add_messages_window
 from .nodes.prerequisites import prerequisites_agent_node
 from .nodes.selection import human_selection_node
 from .nodes.roadmap import roadmap_agent_node
 from .nodes.learning import (
+    prefetch_research_node,
     research_agent_node,
-    critique_agent_node,
     generation_agent_node_main,
     topic_review_node,
 )
-from .nodes.progress import progress_tracker_node
 from .nodes.completion import session_summary_node, session_completion_node
-from .routing.edges import (
-    route_from_start,
-    route_after_prerequisites,
-    route_after_human_selection,
-    route_learning_stage,
-    route_after_generation,
-    route_after_topic_review,
-    route_from_progress_tracker,
-)
 
 
-def create_graph(with_checkpointer: bool = True):
-    """Create the graph with proper conditional routing and individual learning nodes.
+def _check_message_reducer() -> None:
+    """Fail fast if ``messages`` ever loses its append reducer.
     
-    Args:
-        with_checkpointer: If True, adds MemorySaver checkpointer for local testing.
-                          If False, compiles without checkpointer for LangGraph Studio.
+    Nodes return only their new messages. Without the reducer each update
+    would replace the history instead of appending to it, so the graph
+    refuses to build rather than silently dropping messages.
     """
-    graph_builder = (
+    messages_type = get_type_hints(AgentState, include_extras=True)["messages"]
+    if add_messages_window not in getattr(messages_type, "__metadata__", ()):
+        raise TypeError("AgentState.messages must be Annotated with the add_messages_window reducer")
+
+
+@lru_cache(maxsize=1)
+def _graph_builder() -> StateGraph:
+    """Build the workflow's nodes and edges once; each compile reuses the builder."""
+    _check_message_reducer()
+    return (
         StateGraph(AgentState, config_schema=Configuration)
         
         # Main workflow nodes
@@ -40,82 +43,60 @@ def create_graph(with_checkpointer: bool = True):
         .add_node("roadmap_agent", roadmap_agent_node)
         
         # Individual learning nodes (moved from subgraph)
+        .add_node("prefetch_research", prefetch_research_node)
         .add_node("research_agent", research_agent_node)
-        .add_node("critique_agent", critique_agent_node)
         .add_node("generation_agent_main", generation_agent_node_main)
         .add_node("topic_review", topic_review_node)  # Human-in-the-loop node
-        .add_node("progress_tracker", progress_tracker_node)
         
         # Session completion node
         .add_node("session_summary", session_summary_node)  # New summary node
         
+        # Fixed transitions are static edges, so no router runs for them
         # Entry point - always go to prerequisites first
-        .add_conditional_edges(
-            START,
-            route_from_start,
-            {"prerequisites": "prerequisites_agent"}
-        )
+        .add_edge(START, "prerequisites_agent")
         
         # Prerequisites -> Human Selection (always)
-        .add_conditional_edges(
-            "prerequisites_agent",
-            route_after_prerequisites,
-            {"human_selection": "human_selection"}
-        )
+        .add_edge("prerequisites_agent", "human_selection")
         
         # Human Selection -> Roadmap (always)
-        .add_conditional_edges(
-            "human_selection",
-            route_after_human_selection,
-            {"roadmap": "roadmap_agent"}
-        )
+        .add_edge("human_selection", "roadmap_agent")
         
-        # Roadmap -> Learning Stage
-        .add_conditional_edges(
-            "roadmap_agent",
-            route_learning_stage,
-            {
-                "research": "research_agent",
-            }
-        )
+        # Roadmap -> Learning Stage (research for all topics is prefetched first)
+        .add_edge("roadmap_agent", "prefetch_research")
+        .add_edge("prefetch_research", "research_agent")
         
-        # Learning flow: Research -> Critique -> Generation -> Topic Review -> Progress Tracker
-        .add_edge("research_agent", "critique_agent")
-        .add_edge("critique_agent", "generation_agent_main")
-        .add_conditional_edges(
-            "generation_agent_main",
-            route_after_generation,
-            {"topic_review": "topic_review"}
-        )
-        .add_conditional_edges(
-            "topic_review",
-            route_after_topic_review,
-            {
-                "progress_tracker": "progress_tracker",
-                "research_agent": "research_agent",  # For regeneration
-                "topic_review": "topic_review"  # For continued Q&A
-            }
-        )
+        # Learning flow: Research -> Generation -> Topic Review
+        # (generation reviews the research itself, in the same LLM call)
+        .add_edge("research_agent", "generation_agent_main")
+        .add_edge("generation_agent_main", "topic_review")
+        # Topic review routes itself with Command: more Q&A, a regenerated lesson,
+        # or (with progress tracked in the same step) the next topic's research
+        # or the session summary
         
-        # After progress tracking, continue, go to summary, or end
-        .add_conditional_edges(
-            "progress_tracker",
-            route_from_progress_tracker,
-            {
-                "research": "research_agent",  # Next topic
-                "session_summary": "session_summary"  # Session complete
-            }
-        )
-        
-        # Session summary creates interrupt, then routes to completion
+        # Session summary, then completion (which shows it and waits for the user)
         .add_edge("session_summary", "session_completion")
         
         # Session completion node for final cleanup
         .add_node("session_completion", session_completion_node)
         .add_edge("session_completion", END)
     )
+
+
+def create_graph(with_checkpointer: bool = True, checkpointer: Optional[BaseCheckpointSaver] = None):
+    """Create the graph with proper conditional routing and individual learning nodes.
+    
+    Args:
+        with_checkpointer: If True, adds MemorySaver checkpointer for local testing.
+                          If False, compiles without checkpointer for LangGraph Studio.
+        checkpointer: Optional pre-built checkpointer (e.g. a shared AsyncSqliteSaver)
+                      to use instead of a fresh MemorySaver.
+    """
+    graph_builder = _graph_builder()
     
-    if with_checkpointer:
+    if checkpointer is not None:
+        # Caller-provided persistent checkpointer, shared across sessions
+        return graph_builder.compile(checkpointer=checkpointer)
+    elif with_checkpointer:
         # For local testing - include checkpointer
         memory = MemorySaver()
         return graph_builder.compile(checkpointer=memory)
@@ -124,8 +105,21 @@ def create_graph(with_checkpointer: bool = True):
         return graph_builder.compile()
 
 
-# Default graph for LangGraph Studio (no checkpointer)
-graph = create_graph(with_checkpointer=False)
+@lru_cache(maxsize=2)
+def _default_graph(with_checkpointer: bool):
+    """Compile a module-level graph on first use."""
+    return create_graph(with_checkpointer=with_checkpointer)
+
 
-# Graph with checkpointer for local testing
-graph_with_memory = create_graph(with_checkpointer=True) 
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    """Compile the module-level graphs lazily (PEP 562).
+    
+    ``graph`` is the default graph for LangGraph Studio (no checkpointer) and
+    ``graph_with_memory`` has a checkpointer for local testing. Importing this
+    module, e.g. for ``create_graph``, no longer compiles either of them.
+    """
+    if name == "graph":
+        return _default_graph(False)
+    if name == "graph_with_memory":
+        return _default_graph(True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -20,6 +20,7 @@ try:
     from agent.runner import TutorWorkflowRunner
     from agent.utils.handlers import InterruptHandler
     from agent.utils.tracker import ProgressTracker
+    from agent.utils.serialization import dumps_state
     from langchain_core.messages import HumanMessage, AIMessage
     IMPORTS_SUCCESSFUL = True
 except ImportError as e:
@@ -154,6 +155,8 @@ def initialize_session_state():
     
     try:
         if "workflow_runner" not in st.session_state:
+            # Each action runs in a fresh asyncio.run loop; tune those loops once
+            TutorWorkflowRunner.configure_runtime()
             st.session_state.workflow_runner = TutorWorkflowRunner(use_checkpointer=True)
         
         if "session_config" not in st.session_state:
@@ -480,7 +483,7 @@ async def resume_workflow(user_response):
             elif workflow_stage in ["complete", "session_summary"]:
                 # Try to get final state if workflow stage indicates completion
                 try:
-                    final_state_result = st.session_state.workflow_runner.get_session_state(
+                    final_state_result = await st.session_state.workflow_runner.aget_session_state(
                         st.session_state.session_config
                     )
                     if final_state_result["success"]:
@@ -700,8 +703,8 @@ def main():
                 
                 # Handle interrupts
                 if st.session_state.current_interrupt:
-                    interrupt_type = st.session_state.current_interrupt["type"]
-                    interrupt_data = st.session_state.current_interrupt["data"]
+                    interrupt_type = st.session_state.current_interrupt.type
+                    interrupt_data = st.session_state.current_interrupt.data
                     
                     if interrupt_type == "prerequisite_selection":
                         response = handle_prerequisite_selection(interrupt_data)
@@ -898,6 +901,10 @@ def main():
                 })
             
             st.json(debug_info)
+            
+            if st.session_state.current_state:
+                st.markdown("**📦 Raw State**")
+                st.code(dumps_state(st.session_state.current_state), language="json")
 
 if __name__ == "__main__":
     main()